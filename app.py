@@ -7,7 +7,7 @@ import streamlit as st
 import asyncio
 import nest_asyncio
 import os
-import re
+import uuid
 
 # Apply nest_asyncio
 nest_asyncio.apply()
@@ -64,54 +64,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def clean_agent_response(raw_response):
-    """
-    Clean the raw agent response to extract readable text.
-    """
-    response_str = str(raw_response)
-    
-    if not response_str or response_str == "None":
-        return "No response received from the agent."
-    
-    # Check if it's an Event object
-    if 'Event(model_version=' in response_str:
-        try:
-            # Method 1: Extract text between triple quotes
-            text_matches = re.findall(r'text="""(.*?)"""', response_str, re.DOTALL)
-            if text_matches:
-                cleaned_text = text_matches[0].strip()
-                if cleaned_text:
-                    return cleaned_text
-            
-            # Method 2: Look for content parts
-            if 'Content(parts=[' in response_str:
-                # Find the main text content
-                pattern = r'Part\(.*?text="""(.*?)""".*?\)'
-                matches = re.findall(pattern, response_str, re.DOTALL)
-                if matches:
-                    return matches[0].strip()
-            
-            # Method 3: Fallback - clean up the string
-            cleaned = response_str.replace('Event(model_version=', '')
-            cleaned = cleaned.replace('Content(parts=[Part(text="""', '')
-            cleaned = cleaned.replace('""",)], role=', '')
-            cleaned = cleaned.replace('model', '')
-            
-            # Remove excessive whitespace
-            cleaned = re.sub(r'\s+', ' ', cleaned)
-            return cleaned.strip()
-            
-        except Exception as e:
-            return f"Error processing response: {str(e)}"
-    
-    # If it's just regular text
-    else:
-        # Clean up any remaining artifacts
-        cleaned = response_str
-        # Remove multiple newlines
-        cleaned = re.sub(r'\n\s*\n', '\n\n', cleaned)
-        return cleaned.strip()
-
 # ==================== APP TITLE & DESCRIPTION ====================
 st.markdown('<h1 class="main-header">🌾 AI Agritech Content Pipeline</h1>', unsafe_allow_html=True)
 st.markdown("""
@@ -124,12 +76,17 @@ Research any AI-in-agriculture topic and produce fact-checked LinkedIn content u
 # ==================== INITIALIZE SESSION STATE ====================
 if 'agent_initialized' not in st.session_state:
     st.session_state.agent_initialized = False
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if 'conversation_history' not in st.session_state:
-    st.session_state.conversation_history = []
+    from core.history import ConversationHistory
+    st.session_state.conversation_history = ConversationHistory(st.session_state.session_id)
 if 'api_key' not in st.session_state:
     st.session_state.api_key = ""
 if 'final_post' not in st.session_state:
     st.session_state.final_post = None
+if 'last_run_peak_mb' not in st.session_state:
+    st.session_state.last_run_peak_mb = None
 
 # ==================== SIDEBAR FOR INPUT ====================
 with st.sidebar:
@@ -201,12 +158,21 @@ with st.sidebar:
         use_container_width=True
     )
     
+    # Worker pool mode
+    use_worker_pool = st.checkbox(
+        "⚡ Run in worker pool",
+        value=False,
+        help="Run generation in separate worker processes (one per CPU core) fed from a local job queue"
+    )
+    
     st.markdown("---")
     
     # Clear conversation
     if st.button("🗑️ Clear Results", use_container_width=True):
-        st.session_state.conversation_history = []
+        st.session_state.conversation_history.clear()
         st.session_state.final_post = None
+        st.session_state.last_run_peak_mb = None
+        st.session_state.pop('archive_match', None)
         st.rerun()
     
     # Info
@@ -227,41 +193,53 @@ async def run_pipeline_async(topic: str, api_key: str):
     Execute the content pipeline using a master agent.
     """
     try:
-        # Set API key
-        os.environ["GOOGLE_API_KEY"] = api_key
-        
-        # Import ADK components
-        from google.adk.runners import InMemoryRunner
-        from core.workflow import create_content_pipeline
-        
-        # Create the master agent
-        master_agent = create_content_pipeline()
-        
-        # Create runner
-        runner = InMemoryRunner(agent=master_agent)
-        
-        # Execute the complete workflow
-        query = f"""Create a fact-checked LinkedIn post about: {topic}
-
-Follow this complete workflow:
-1. RESEARCH: Search for current information, statistics, and case studies
-2. WRITE: Create a professional LinkedIn post with hook, insights, applications, outlook, and hashtags
-3. VERIFY: Fact-check the post for accuracy
-4. ITERATE: Make corrections if needed
-
-Return only the final LinkedIn post."""
-        
-        result = await runner.run_debug(query)
-        
-        # Clean and return result
-        if result:
-            return clean_agent_response(result)
-        return None
+        from core.workflow import run_content_pipeline
+        return await run_content_pipeline(topic, api_key)
         
     except Exception as e:
         st.error(f"Pipeline error: {str(e)}")
         raise
 
+@st.cache_resource
+def get_worker_pool():
+    """
+    Start one worker pool per Streamlit server, shared by all sessions.
+    """
+    from core.worker_pool import WorkerPool
+    return WorkerPool().start()
+
+def run_pipeline_in_pool(topic: str, api_key: str, status_placeholder):
+    """
+    Submit the topic to the worker pool and stream job status until it finishes
+    or 10 minutes pass. Returns the post and the worker's peak RSS in MB during the run.
+    """
+    pool = get_worker_pool()
+    job_id = pool.submit(topic, api_key)
+    job = pool.wait(
+        job_id,
+        timeout=600,
+        on_status=lambda job: status_placeholder.caption(f"⚙️ Job status: {job['status']}")
+    )
+    status_placeholder.empty()
+    if job["status"] == "failed":
+        raise RuntimeError(job["error"])
+    return job["result"], job["peak_rss_mb"]
+
+@st.cache_resource
+def get_post_archive():
+    """
+    Open the searchable post archive once per Streamlit server.
+    """
+    from core.archive import PostArchive
+    return PostArchive()
+
+def find_archived_post(topic):
+    """
+    Return a recent archived post for a closely matching topic, or None.
+    """
+    from core.archive import MAX_REUSE_AGE_SECONDS
+    return get_post_archive().find_match(topic, max_age=MAX_REUSE_AGE_SECONDS)
+
 # ==================== MAIN CONTENT AREA ====================
 # Display the final post from a previous run if it exists
 if st.session_state.final_post:
@@ -271,7 +249,10 @@ if st.session_state.final_post:
         st.session_state.final_post,
         height=300
     )
-    st.caption(f"Character count: {len(st.session_state.final_post)}")
+    stats = f"Character count: {len(st.session_state.final_post)}"
+    if st.session_state.last_run_peak_mb is not None:
+        stats += f" • Worker peak RSS during this run: {st.session_state.last_run_peak_mb:.1f} MB"
+    st.caption(stats)
     st.divider()
 
 # Status column
@@ -280,11 +261,17 @@ col1, col2 = st.columns([3, 1])
 with col1:
     st.markdown("### 💬 LinkedIn Post Generator")
     
-    if generate_button:
+    # Set when the user chose to regenerate instead of reusing an archived post
+    force_generate = st.session_state.pop('force_generate', False)
+    
+    if generate_button or force_generate:
         if not st.session_state.get('agent_initialized', False):
             st.warning("⚠️ Please initialize the AI agent first (sidebar)")
         elif not topic.strip():
             st.warning("⚠️ Please enter a topic")
+        elif not force_generate and (archived := find_archived_post(topic)):
+            # Offer the archived post before paying for a new run
+            st.session_state.archive_match = archived
         else:
             with st.spinner("🌾 AI is generating your LinkedIn post... This takes 1-2 minutes."):
                 try:
@@ -299,11 +286,17 @@ with col1:
                     with st.chat_message("user"):
                         st.markdown(f"**Topic:** {topic}")
                     
-                    # Run the async pipeline
-                    final_post = asyncio.run(run_pipeline_async(topic, api_key))
+                    # Run the pipeline in the worker pool or in-process
+                    # Peak RSS is only per-run in a pool worker; the server process is shared by all sessions
+                    peak_rss_mb = None
+                    if use_worker_pool:
+                        final_post, peak_rss_mb = run_pipeline_in_pool(topic, api_key, st.empty())
+                    else:
+                        final_post = asyncio.run(run_pipeline_async(topic, api_key))
                     
                     # Store in session state
                     st.session_state.final_post = final_post
+                    st.session_state.last_run_peak_mb = peak_rss_mb
                     
                     # Add to conversation history
                     st.session_state.conversation_history.append({
@@ -329,6 +322,33 @@ with col1:
                         "timestamp": "Now"
                     })
 
+    # Offer an archived post for a closely matching topic
+    if st.session_state.get('archive_match'):
+        match = st.session_state.archive_match
+        st.info(f"📚 A post on a similar topic is already in the archive: **{match['topic']}**")
+        st.text_area("Archived post:", match["linkedin_post"], height=200, disabled=True)
+        use_col, new_col = st.columns(2)
+        if use_col.button("✅ Use archived post", use_container_width=True):
+            st.session_state.conversation_history.append({
+                "role": "user",
+                "content": f"Topic: {topic}",
+                "timestamp": "Now"
+            })
+            st.session_state.conversation_history.append({
+                "role": "assistant",
+                "content": match["linkedin_post"],
+                "timestamp": "Now"
+            })
+            st.session_state.final_post = match["linkedin_post"]
+            st.session_state.last_run_peak_mb = None
+            get_post_archive().record_hit(match, "post")
+            del st.session_state.archive_match
+            st.rerun()
+        if new_col.button("🔄 Generate a new post", use_container_width=True):
+            del st.session_state.archive_match
+            st.session_state.force_generate = True
+            st.rerun()
+
 with col2:
     st.markdown("### 📊 Agent Status")
     
@@ -347,6 +367,13 @@ with col2:
         total_messages = len(st.session_state.conversation_history)
         if total_messages > 0:
             st.caption(f"💬 {total_messages} messages in history")
+        
+        pregenerated = get_post_archive().hit_report()
+        if pregenerated["post"] or pregenerated["research"]:
+            st.caption(
+                f"♻️ Served from pre-generated content: "
+                f"{pregenerated['post']} posts, {pregenerated['research']} research"
+            )
     else:
         st.markdown("""
         <div class="warning-box">
@@ -363,7 +390,19 @@ if st.session_state.conversation_history and not st.session_state.final_post:
     st.markdown("---")
     st.markdown("### 📜 Conversation History")
     
-    for i, message in enumerate(st.session_state.conversation_history):
+    # Only the selected page is rendered (and read from disk if archived)
+    history = st.session_state.conversation_history
+    per_page = 10
+    page = st.number_input(
+        "History page (1 = most recent):",
+        min_value=1,
+        max_value=history.page_count(per_page),
+        value=1,
+        key="history_page"
+    )
+    st.caption(f"Page {page} of {history.page_count(per_page)} • {len(history)} messages")
+    
+    for message in history.page(page, per_page):
         if message["role"] == "user":
             st.markdown(f'**👤 You:** {message["content"]}')
         else:
@@ -373,6 +412,35 @@ if st.session_state.conversation_history and not st.session_state.final_post:
             else:
                 st.markdown(f'<div class="chat-assistant"><strong>🌾 Content Pipeline:</strong> {message["content"]}</div>', unsafe_allow_html=True)
 
+# ==================== POST ARCHIVE SEARCH ====================
+with st.expander("🔎 Search Post Archive"):
+    search_query = st.text_input(
+        "Search past posts and research:",
+        help="Keyword search over topics, research, posts and verifier feedback"
+    )
+    if search_query.strip():
+        results = get_post_archive().search(search_query)
+        if not results:
+            st.caption("No archived posts match your search.")
+        for entry in results:
+            st.markdown(f"**{entry['topic']}**")
+            metrics = entry["metrics"]
+            if metrics.get("duration_seconds") is not None:
+                st.caption(f"Generated in {metrics['duration_seconds']}s")
+            st.text_area(
+                "Post:",
+                entry["linkedin_post"],
+                height=150,
+                key=f"archive_post_{entry['id']}"
+            )
+            if entry["research_findings"]:
+                st.text_area(
+                    "Research:",
+                    entry["research_findings"],
+                    height=150,
+                    key=f"archive_research_{entry['id']}"
+                )
+
 # ==================== FOOTER ====================
 st.markdown("---")
 st.markdown("""
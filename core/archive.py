@@ -0,0 +1,190 @@
+"""
+archive.py
+Persistent, searchable archive of generated posts and their research.
+
+Each pipeline run is stored in SQLite with a full-text index (FTS5) over the
+topic, research findings, final post and verifier feedback, so content that
+was already paid for can be found by keyword and reused instead of regenerated.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_ARCHIVE_PATH = os.environ.get(
+    "AGRITECH_ARCHIVE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "post_archive.sqlite3"),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    topic TEXT NOT NULL,
+    research_findings TEXT NOT NULL DEFAULT '',
+    linkedin_post TEXT NOT NULL DEFAULT '',
+    verifier_feedback TEXT NOT NULL DEFAULT '',
+    metrics TEXT NOT NULL DEFAULT '{}',
+    source TEXT NOT NULL DEFAULT 'live',
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hits (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    served_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    topic, research_findings, linkedin_post, verifier_feedback
+);
+"""
+
+_COLUMNS = ("id", "topic", "research_findings", "linkedin_post",
+            "verifier_feedback", "metrics", "source", "created_at")
+
+SOURCE_LIVE = "live"
+SOURCE_PREGENERATED = "pregenerated"
+
+# Archived posts and research older than this are not reused for live requests
+MAX_REUSE_AGE_SECONDS = 7 * 24 * 60 * 60
+
+
+def _tokens(text: str):
+    return re.findall(r"\w+", text.lower())
+
+
+def _fts_query(text: str, column: str = None, prefix_match: bool = False) -> str:
+    """
+    Turn free text into an FTS5 query that matches every word.
+    Words are quoted so user input can never be parsed as FTS5 syntax.
+    """
+    column_filter = f"{column} : " if column else ""
+    star = "*" if prefix_match else ""
+    return " AND ".join(f'{column_filter}"{token}"{star}' for token in _tokens(text))
+
+
+class PostArchive:
+    """
+    SQLite FTS5 archive of pipeline runs.
+    One instance may be shared by Streamlit session threads; its connection is used under a lock.
+
+    Args:
+        path (str): Path to the archive database file.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Add columns introduced after an archive file was first created."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(posts)")}
+        if "source" not in columns:
+            self._conn.execute(f"ALTER TABLE posts ADD COLUMN source TEXT NOT NULL DEFAULT '{SOURCE_LIVE}'")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add(self, topic: str, linkedin_post: str, research_findings: str = "",
+            verifier_feedback: str = "", metrics: dict = None,
+            source: str = SOURCE_LIVE) -> int:
+        """
+        Store a pipeline run and return its archive id.
+        Research-only runs are stored with an empty `linkedin_post`.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO posts (topic, research_findings, linkedin_post, verifier_feedback, metrics, source, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (topic, research_findings, linkedin_post, verifier_feedback,
+                 json.dumps(metrics or {}), source, time.time()),
+            )
+            post_id = cursor.lastrowid
+            self._conn.execute(
+                "INSERT INTO posts_fts (rowid, topic, research_findings, linkedin_post, verifier_feedback) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (post_id, topic, research_findings, linkedin_post, verifier_feedback),
+            )
+        return post_id
+
+    def _query(self, match: str, limit: int, created_after: float = None):
+        if not match:
+            return []
+        where, params = "posts_fts MATCH ?", (match,)
+        if created_after is not None:
+            where, params = "posts_fts MATCH ? AND p.created_at >= ?", (match, created_after)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join('p.' + c for c in _COLUMNS)} FROM posts_fts "
+                "JOIN posts p ON p.id = posts_fts.rowid "
+                f"WHERE {where} ORDER BY bm25(posts_fts) LIMIT ?",
+                params + (limit,),
+            ).fetchall()
+        results = []
+        for row in rows:
+            entry = dict(zip(_COLUMNS, row))
+            entry["metrics"] = json.loads(entry["metrics"])
+            results.append(entry)
+        return results
+
+    def search(self, query: str, limit: int = 10):
+        """Keyword (prefix) search across all archived fields, best matches first."""
+        return self._query(_fts_query(query, prefix_match=True), limit)
+
+    def find_match(self, topic: str, min_similarity: float = 0.8, field: str = "linkedin_post",
+                   max_age: float = None):
+        """
+        Return the best archived run whose topic closely matches `topic`, or None.
+        Candidates must contain every word of the topic, share at least
+        `min_similarity` of their words with it (Jaccard similarity), have
+        a non-empty `field` and, if `max_age` is given, be at most that many
+        seconds old.
+        """
+        wanted = set(_tokens(topic))
+        if not wanted:
+            return None
+        created_after = None if max_age is None else time.time() - max_age
+        for entry in self._query(_fts_query(topic, column="topic"), limit=20, created_after=created_after):
+            if not entry[field]:
+                continue
+            found = set(_tokens(entry["topic"]))
+            if len(wanted & found) / len(wanted | found) >= min_similarity:
+                return entry
+        return None
+
+    def find_research(self, topic: str, min_similarity: float = 0.8, max_age: float = None):
+        """Return the best archived run with research for a closely matching topic, or None."""
+        return self.find_match(topic, min_similarity, field="research_findings", max_age=max_age)
+
+    def record_hit(self, entry: dict, kind: str):
+        """Record that a live request was served an archived post or research ('post' / 'research')."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO hits (post_id, kind, source, served_at) VALUES (?, ?, ?, ?)",
+                (entry["id"], kind, entry["source"], time.time()),
+            )
+
+    def hit_report(self, source: str = SOURCE_PREGENERATED) -> dict:
+        """Count live requests served from archived artifacts of a source, by kind."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, COUNT(*) FROM hits WHERE source = ? GROUP BY kind",
+                (source,),
+            ).fetchall()
+        report = {"post": 0, "research": 0}
+        report.update(dict(rows))
+        return report
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
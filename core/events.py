@@ -0,0 +1,284 @@
+"""
+events.py
+Bounded retention of runner events.
+
+Instead of collecting every event of a run (including search tool payloads
+from each refinement loop) and stringifying the whole list, a RunDigest
+consumes events as they stream from the runner and keeps only the final
+text, a short summary per stage, the most recent intermediate texts and
+the search queries and sources cited by Google Search grounding. Tool
+call/response payloads are counted and dropped. Session state written by
+the agents is read from each event's state delta, so the session never
+has to be copied back out of the session service.
+
+Run `python -m core.events` to compare peak memory of both approaches on
+synthetic runs.
+"""
+
+import os
+import sys
+import threading
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def current_rss_mb():
+    """Current resident set size of this process in MB, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _max_rss_mb():
+    """Lifetime peak RSS of this process in MB (a high-water mark), or None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class RssSampler:
+    """
+    Samples this process's RSS from a background thread while active and
+    keeps the highest value, i.e. the process's peak RSS during the scope.
+
+    Meant for pool worker processes, where the process is the unit that
+    runs jobs; it is not a per-run number for a server handling several
+    sessions. Where /proc is unavailable the process's lifetime peak from
+    getrusage is reported instead.
+    """
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None and (self.peak_mb is None or rss > self.peak_mb):
+            self.peak_mb = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        if self.peak_mb is None:
+            self.peak_mb = _max_rss_mb()
+        if self.peak_mb is not None:
+            self.peak_mb = round(self.peak_mb, 1)
+
+
+def _parts(event):
+    content = getattr(event, "content", None)
+    return getattr(content, "parts", None) or []
+
+
+class StageSummary:
+    """What is kept for one stage (agent) of a run."""
+
+    def __init__(self, max_texts: int, max_chars: int):
+        self.max_chars = max_chars
+        self.event_count = 0
+        self.tool_calls = {}
+        self.tool_responses = 0
+        self.texts = deque(maxlen=max_texts)
+
+    def add_text(self, text: str):
+        self.texts.append(text[:self.max_chars])
+
+    def as_dict(self) -> dict:
+        return {
+            "events": self.event_count,
+            "tool_calls": dict(self.tool_calls),
+            "tool_responses": self.tool_responses,
+        }
+
+
+class RunDigest:
+    """
+    Consumes runner events one at a time and keeps a bounded summary.
+
+    Args:
+        max_texts_per_stage (int): Most recent texts kept per stage.
+        max_chars (int): Each kept text is truncated to this length.
+        max_sources (int): Grounding sources and search queries kept per run.
+        state_keys (tuple): Session state keys whose latest value is kept.
+    """
+
+    def __init__(self, max_texts_per_stage: int = 5, max_chars: int = 4000,
+                 max_sources: int = 30, state_keys=("research_findings", "linkedin_post")):
+        self.max_texts_per_stage = max_texts_per_stage
+        self.max_chars = max_chars
+        self.max_sources = max_sources
+        self.state_keys = state_keys
+        self.state = {}
+        self.final_text = ""
+        self.event_count = 0
+        self.stages = {}
+        # Texts that turned out not to be the final response, oldest first
+        self._intermediate_texts = deque(maxlen=max_texts_per_stage * 2)
+        self._sources = {}
+        self._search_queries = []
+
+    def __bool__(self):
+        return self.event_count > 0
+
+    def add(self, event):
+        self.event_count += 1
+        author = getattr(event, "author", None) or "unknown"
+        stage = self.stages.get(author)
+        if stage is None:
+            stage = self.stages[author] = StageSummary(self.max_texts_per_stage, self.max_chars)
+        stage.event_count += 1
+
+        texts = []
+        has_tool_activity = False
+        for part in _parts(event):
+            function_call = getattr(part, "function_call", None)
+            if function_call is not None:
+                has_tool_activity = True
+                name = getattr(function_call, "name", None) or "unknown"
+                stage.tool_calls[name] = stage.tool_calls.get(name, 0) + 1
+            if getattr(part, "function_response", None) is not None:
+                # Tool payloads (e.g. search results) are counted, never retained
+                has_tool_activity = True
+                stage.tool_responses += 1
+            if getattr(part, "text", None):
+                texts.append(part.text)
+
+        if getattr(event, "partial", False):
+            return
+        self._add_grounding(getattr(event, "grounding_metadata", None))
+        state_delta = getattr(getattr(event, "actions", None), "state_delta", None) or {}
+        for key in self.state_keys:
+            if key in state_delta:
+                self.state[key] = state_delta[key]
+
+        if texts:
+            text = "\n".join(texts)
+            stage.add_text(text)
+            if has_tool_activity:
+                self._intermediate_texts.append(text[:self.max_chars])
+            else:
+                if self.final_text:
+                    self._intermediate_texts.append(self.final_text[:self.max_chars])
+                self.final_text = text
+
+    def _add_grounding(self, grounding):
+        """Keep the queries and cited web sources of a Google Search grounded response."""
+        if grounding is None:
+            return
+        for query in getattr(grounding, "web_search_queries", None) or []:
+            if query not in self._search_queries and len(self._search_queries) < self.max_sources:
+                self._search_queries.append(query)
+        for chunk in getattr(grounding, "grounding_chunks", None) or []:
+            web = getattr(chunk, "web", None)
+            uri = getattr(web, "uri", None)
+            if uri and uri not in self._sources and len(self._sources) < self.max_sources:
+                self._sources[uri] = getattr(web, "title", None) or uri
+
+    def intermediate_texts(self):
+        """Texts produced before the final response (research notes, verification reports)."""
+        return list(self._intermediate_texts)
+
+    def search_queries(self):
+        return list(self._search_queries)
+
+    def sources(self):
+        """Cited web sources as (title, uri) pairs."""
+        return [(title, uri) for uri, title in self._sources.items()]
+
+    def stage_texts(self, author_contains: str):
+        """Kept texts of every stage whose author name contains `author_contains`."""
+        return [
+            text
+            for author, stage in self.stages.items()
+            if author_contains in author
+            for text in stage.texts
+        ]
+
+    def summary(self) -> dict:
+        return {author: stage.as_dict() for author, stage in self.stages.items()}
+
+
+# ==================== BENCHMARK ====================
+def synthetic_events(loops: int, payload_kb: int):
+    """Events shaped like a search-heavy run: tool calls, big responses, texts."""
+    from types import SimpleNamespace as NS
+
+    for loop in range(loops):
+        for author in ("researcher", "writer", "verifier"):
+            yield NS(author=author, partial=False, content=NS(parts=[
+                NS(text=None, function_call=NS(name="google_search", args={"q": author}), function_response=None)
+            ]))
+            response = {"results": author[0] * (payload_kb * 1024)}
+            yield NS(author=author, partial=False, content=NS(parts=[
+                NS(text=None, function_call=None, function_response=NS(name="google_search", response=response))
+            ]))
+            yield NS(author=author, partial=False, content=NS(parts=[
+                NS(text=f"{author} output for loop {loop} " * 50, function_call=None, function_response=None)
+            ]))
+
+
+def run_benchmark(loops: int = 3, payload_kb: int = 512):
+    """
+    Print peak traced memory of one run for the old and new event handling.
+
+    Both strategies model the in-memory session service, which keeps every
+    event on the session for the agent's own context until the run ends:
+    - before: session events + the list returned by run_debug + a deep copy
+      of the session from get_session() + str() of the whole list
+    - after: session events + a RunDigest, then the session is deleted
+
+    The objects are synthetic stand-ins for ADK events, so the numbers show
+    the relative saving, not the absolute memory of a real pipeline run.
+    """
+    import copy
+    import tracemalloc
+
+    def before():
+        session_events, collected = [], []
+        for event in synthetic_events(loops, payload_kb):
+            session_events.append(event)
+            collected.append(event)
+        session_copy = copy.deepcopy(session_events)
+        return str(collected)[:100], len(session_copy)
+
+    def after():
+        session_events, run = [], RunDigest()
+        for event in synthetic_events(loops, payload_kb):
+            session_events.append(event)
+            run.add(event)
+        session_events.clear()
+        return run.final_text[:100]
+
+    print(f"{'strategy':>8} {'peak MB':>10}")
+    for name, fn in (("before", before), ("after", after)):
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:>8} {peak / (1024 * 1024):>10.2f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,141 @@
+"""
+history.py
+Bounded conversation history for a Streamlit session.
+
+Recent entries stay in an in-memory ring buffer. Older entries are spilled
+to a per-session JSON Lines file and only read back when the page that
+shows them is rendered, so rerun cost and per-user memory stay flat no
+matter how many posts a session generates.
+
+The file is removed when its ConversationHistory is garbage collected
+(i.e. the Streamlit session ended). Files left behind by a crashed server
+are swept once they are older than a day; files of histories still alive
+in this process are never swept, however long the session has been idle.
+"""
+
+import json
+import os
+import tempfile
+import time
+import weakref
+from collections import deque
+
+DEFAULT_HISTORY_DIR = os.path.join(tempfile.gettempdir(), "agritech_history")
+STALE_AFTER_SECONDS = 24 * 60 * 60
+
+# Archive path -> live ConversationHistory in this process
+_live_histories = weakref.WeakValueDictionary()
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def sweep_stale_history(history_dir: str = DEFAULT_HISTORY_DIR,
+                        max_age: float = STALE_AFTER_SECONDS) -> int:
+    """
+    Delete archive files not written to for `max_age` seconds, except those
+    of live histories. Returns the number removed.
+    """
+    removed = 0
+    cutoff = time.time() - max_age
+    for entry in os.scandir(history_dir):
+        if not entry.name.endswith(".jsonl") or os.path.abspath(entry.path) in _live_histories:
+            continue
+        try:
+            stale = entry.stat().st_mtime < cutoff
+        except FileNotFoundError:  # Removed by another session's sweep
+            continue
+        if stale:
+            _remove_file(entry.path)
+            removed += 1
+    return removed
+
+
+class ConversationHistory:
+    """
+    Conversation history with a fixed in-memory size and an on-disk archive.
+
+    Args:
+        session_id (str): Identifies the per-session archive file.
+        max_in_memory (int): Number of most recent entries kept in memory.
+        history_dir (str): Directory holding the archive files.
+    """
+
+    def __init__(self, session_id: str, max_in_memory: int = 20,
+                 history_dir: str = DEFAULT_HISTORY_DIR):
+        self.max_in_memory = max_in_memory
+        self.path = os.path.abspath(os.path.join(history_dir, f"{session_id}.jsonl"))
+        self._recent = deque(maxlen=max_in_memory)
+        # Byte offset of each archived entry, so pages can seek straight to them
+        self._offsets = []
+        os.makedirs(history_dir, mode=0o700, exist_ok=True)
+        _live_histories[self.path] = self
+        sweep_stale_history(history_dir)
+        # Session state is dropped when the session ends; take the file with it
+        self._finalizer = weakref.finalize(self, _remove_file, self.path)
+
+    def __len__(self):
+        return len(self._offsets) + len(self._recent)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def append(self, entry: dict):
+        """Add an entry, spilling the oldest in-memory entry to disk when full."""
+        if len(self._recent) == self.max_in_memory:
+            self._spill(self._recent[0])
+        self._recent.append(entry)
+
+    def _spill(self, entry: dict):
+        with open(self.path, "ab") as f:
+            self._offsets.append(f.tell())
+            f.write(json.dumps(entry).encode("utf-8") + b"\n")
+
+    def _read_archived(self, start: int, stop: int):
+        """
+        Read archived entries [start, stop). If the file was removed or
+        truncated behind our back, the archived entries are dropped.
+        """
+        if start >= stop:
+            return []
+        entries = []
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offsets[start])
+                for _ in range(stop - start):
+                    entries.append(json.loads(f.readline()))
+        except (FileNotFoundError, ValueError):
+            self._offsets = []
+            return []
+        return entries
+
+    def page_count(self, per_page: int) -> int:
+        return max(1, -(-len(self) // per_page))
+
+    def page(self, page: int, per_page: int = 10):
+        """
+        Return the entries for a page in chronological order.
+        Page 1 holds the most recent entries.
+        """
+        total = len(self)
+        stop = max(0, total - (page - 1) * per_page)
+        start = max(0, stop - per_page)
+
+        archived = len(self._offsets)
+        entries = self._read_archived(start, min(stop, archived))
+        if len(self._offsets) != archived:
+            # The archive was lost, so the page boundaries moved
+            return self.page(page, per_page)
+        recent = list(self._recent)
+        entries.extend(recent[max(0, start - archived):max(0, stop - archived)])
+        return entries
+
+    def clear(self):
+        """Drop all entries, including the on-disk archive."""
+        self._recent.clear()
+        self._offsets = []
+        _remove_file(self.path)
@@ -0,0 +1,215 @@
+"""
+scheduler.py
+Off-peak pre-generation of research and posts for popular topics.
+
+Runs the research stage (and optionally the full pipeline) for a configured
+topic list during an off-peak window, within a per-window run budget. The
+results are stored in the post archive as 'pregenerated', where live
+requests pick them up: archived posts are offered before generating, and
+archived research lets the pipeline skip its search phase.
+
+Usage:
+    GOOGLE_API_KEY=... python -m core.scheduler --topics-file topics.txt --window 1-6 --budget 20
+    python -m core.scheduler --report
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+from core.archive import PostArchive, DEFAULT_ARCHIVE_PATH, MAX_REUSE_AGE_SECONDS, SOURCE_PREGENERATED
+
+
+class PregenerationScheduler:
+    """
+    Warms the archive for a list of topics during an off-peak window.
+
+    Args:
+        topics (list): Topics to pre-generate.
+        api_key (str): The Gemini API key.
+        window (tuple): Off-peak (start_hour, end_hour) in local time. May wrap past midnight.
+        budget (int): Maximum pipeline runs per off-peak window.
+        full_posts (bool): Generate full posts, not just research.
+        archive_path (str): Path to the post archive database.
+        max_age (float): Seconds after which archived content no longer counts
+            as warm and is generated again. Matches what live requests reuse.
+    """
+
+    def __init__(self, topics, api_key: str, window=(1, 6), budget: int = 10,
+                 full_posts: bool = False, archive_path: str = DEFAULT_ARCHIVE_PATH,
+                 max_age: float = MAX_REUSE_AGE_SECONDS):
+        self.topics = [t.strip() for t in topics if t.strip()]
+        self.api_key = api_key
+        self.window = window
+        self.budget = budget
+        self.full_posts = full_posts
+        self.max_age = max_age
+        self.archive = PostArchive(archive_path)
+        self._window_key = None
+        self._runs_in_window = 0
+
+    def close(self):
+        self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def in_off_peak(self, now: datetime = None) -> bool:
+        hour = (now or datetime.now()).hour
+        start, end = self.window
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    def _window_start(self, now: datetime):
+        """Date the current window opened on, so a window past midnight keeps one budget."""
+        start, end = self.window
+        if start > end and now.hour < end:
+            return (now - timedelta(days=1)).date()
+        return now.date()
+
+    def _is_warm(self, topic: str) -> bool:
+        if self.full_posts:
+            return self.archive.find_match(topic, max_age=self.max_age) is not None
+        return self.archive.find_research(topic, max_age=self.max_age) is not None
+
+    def run_once(self, now: datetime = None):
+        """
+        Pre-generate every cold topic the remaining budget allows, stopping
+        as soon as the off-peak window closes.
+        Returns the list of topics warmed in this call.
+        """
+        now = now or datetime.now()
+        if not self.in_off_peak(now):
+            return []
+
+        window_key = self._window_start(now)
+        if window_key != self._window_key:
+            self._window_key = window_key
+            self._runs_in_window = 0
+
+        warmed = []
+        for topic in self.topics:
+            if self._runs_in_window >= self.budget:
+                break
+            # A pass can take longer than the rest of the window
+            if not self.in_off_peak(datetime.now()):
+                break
+            if self._is_warm(topic):
+                continue
+            self._runs_in_window += 1
+            try:
+                if self._pregenerate(topic):
+                    warmed.append(topic)
+            except Exception as e:
+                print(f"❌ Pre-generation failed for '{topic}': {e}")
+        return warmed
+
+    def _pregenerate(self, topic: str) -> bool:
+        from core.workflow import run_content_pipeline, run_research_stage
+
+        if self.full_posts:
+            post = asyncio.run(run_content_pipeline(
+                topic, self.api_key, source=SOURCE_PREGENERATED,
+                archive_path=self.archive.path,
+            ))
+            return bool(post)
+
+        research, duration = asyncio.run(run_research_stage(topic, self.api_key))
+        if not research:
+            return False
+        self.archive.add(
+            topic=topic,
+            linkedin_post="",
+            research_findings=research,
+            metrics={"duration_seconds": round(duration, 2)},
+            source=SOURCE_PREGENERATED,
+        )
+        return True
+
+    def run_forever(self, check_interval: float = 600):
+        """Check the window every `check_interval` seconds and warm topics while off-peak."""
+        while True:
+            for topic in self.run_once():
+                print(f"✅ Pre-generated: {topic}")
+            time.sleep(check_interval)
+
+
+def print_report(archive_path: str = DEFAULT_ARCHIVE_PATH):
+    archive = PostArchive(archive_path)
+    try:
+        report = archive.hit_report()
+    finally:
+        archive.close()
+    print("Live requests served from pre-generated artifacts:")
+    print(f"   Posts:    {report['post']}")
+    print(f"   Research: {report['research']}")
+
+
+def parse_window(value: str):
+    """Parse an off-peak window like '22-5' into (start_hour, end_hour)."""
+    try:
+        start, end = (int(hour) for hour in value.split("-"))
+    except ValueError:
+        raise ValueError(f"expected START-END hours like 22-5, got '{value}'")
+    if not (0 <= start < 24 and 0 <= end < 24):
+        raise ValueError(f"hours must be between 0 and 23, got '{value}'")
+    if start == end:
+        raise ValueError(f"start and end hour must differ, got '{value}'")
+    return start, end
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate research and posts off-peak.")
+    parser.add_argument("--topics-file", help="File with one topic per line")
+    parser.add_argument("--window", default="1-6", help="Off-peak hours as START-END, e.g. 22-5")
+    parser.add_argument("--budget", type=int, default=10, help="Maximum runs per off-peak window")
+    parser.add_argument("--full", action="store_true", help="Generate full posts, not only research")
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    parser.add_argument("--interval", type=float, default=600, help="Seconds between window checks")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE_PATH, help="Path to the post archive")
+    parser.add_argument("--max-age-days", type=float, default=MAX_REUSE_AGE_SECONDS / 86400,
+                        help="Regenerate topics whose archived content is older than this")
+    parser.add_argument("--report", action="store_true", help="Print pre-generation hit counts and exit")
+    args = parser.parse_args(argv)
+
+    if args.report:
+        print_report(args.archive)
+        return
+
+    if not args.topics_file:
+        parser.error("--topics-file is required unless --report is given")
+    if args.max_age_days <= 0:
+        parser.error("--max-age-days must be positive")
+    try:
+        window = parse_window(args.window)
+    except ValueError as e:
+        parser.error(f"--window: {e}")
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        parser.error("Set GOOGLE_API_KEY to run pre-generation")
+
+    with open(args.topics_file, encoding="utf-8") as f:
+        topics = f.read().splitlines()
+
+    with PregenerationScheduler(
+        topics, api_key, window=window, budget=args.budget,
+        full_posts=args.full, archive_path=args.archive,
+        max_age=args.max_age_days * 86400,
+    ) as scheduler:
+        if args.once:
+            if not scheduler.in_off_peak():
+                print(f"Outside the off-peak window ({args.window}), nothing to do.")
+            for topic in scheduler.run_once():
+                print(f"✅ Pre-generated: {topic}")
+        else:
+            scheduler.run_forever(args.interval)
+
+
+if __name__ == "__main__":
+    main()
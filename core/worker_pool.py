@@ -0,0 +1,424 @@
+"""
+worker_pool.py
+Multi-process worker mode for the content pipeline.
+
+Jobs are written to a local SQLite queue by the Streamlit front-end and
+claimed by a pool of worker processes, so pipeline runs, response parsing
+and validation no longer share one GIL with the UI. Results are written
+back to the same queue and polled by the front-end, which removes each
+job row once its result has been read.
+
+A pipeline run spends most of its time waiting on the model and search,
+so each worker runs several claimed jobs at once on its asyncio loop, up
+to `max_jobs_per_worker`.
+
+Each pool owns its queue file. Unless a path is given, it lives in a
+private temporary directory that is removed when the pool stops.
+
+Run `python -m core.worker_pool` to print a throughput scaling benchmark.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import inspect
+import multiprocessing as mp
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    key_group TEXT,
+    worker_pid INTEGER,
+    peak_rss_mb REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class JobQueue:
+    """
+    Durable job queue backed by a SQLite file.
+    Safe to open from several processes at once; each process keeps its own
+    connection, shared by its threads under a lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def submit(self, topic: str, job_id: str = None, key_group: str = None) -> str:
+        """
+        Add a job to the queue and return its id.
+        Jobs with the same `key_group` may run concurrently in one worker process.
+        """
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, topic, status, key_group, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, topic, STATUS_QUEUED, key_group, now, now),
+        )
+        return job_id
+
+    def claim(self, worker_pid: int, key_group: str = None):
+        """
+        Atomically take the oldest queued job for a worker process, only
+        from `key_group` if given.
+        Returns (job_id, topic, key_group) or None when there is no such job.
+        """
+        where, params = "status = ?", (STATUS_QUEUED,)
+        if key_group is not None:
+            where, params = "status = ? AND key_group = ?", (STATUS_QUEUED, key_group)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT id, topic, key_group FROM jobs WHERE {where} ORDER BY created_at LIMIT 1",
+                    params,
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, worker_pid = ?, updated_at = ? WHERE id = ?",
+                        (STATUS_RUNNING, worker_pid, time.time(), row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def complete(self, job_id: str, result, peak_rss_mb: float = None):
+        self._set_status(job_id, STATUS_DONE, result=result, peak_rss_mb=peak_rss_mb)
+
+    def fail(self, job_id: str, error: str, peak_rss_mb: float = None):
+        self._set_status(job_id, STATUS_FAILED, error=error, peak_rss_mb=peak_rss_mb)
+
+    def _set_status(self, job_id, status, result=None, error=None, peak_rss_mb=None):
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, peak_rss_mb = ?, updated_at = ? WHERE id = ?",
+            (status, result, error, peak_rss_mb, time.time(), job_id),
+        )
+
+    def get(self, job_id: str):
+        """Return the job as a dict, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, topic, status, result, error, peak_rss_mb FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("id", "topic", "status", "result", "error", "peak_rss_mb"), row))
+
+    def delete(self, job_id: str):
+        self._execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def prune(self, max_age: float) -> int:
+        """Delete finished jobs whose results were not collected within `max_age` seconds."""
+        cursor = self._execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (STATUS_DONE, STATUS_FAILED, time.time() - max_age),
+        )
+        return cursor.rowcount
+
+    def fail_orphaned(self, worker_pid: int, error: str) -> int:
+        """Fail the jobs a dead worker process was running."""
+        cursor = self._execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status = ? AND worker_pid = ?",
+            (STATUS_FAILED, error, time.time(), STATUS_RUNNING, worker_pid),
+        )
+        return cursor.rowcount
+
+    def requeue_running(self) -> int:
+        """Put jobs left 'running' by a crashed pool back on the queue."""
+        cursor = self._execute(
+            "UPDATE jobs SET status = ?, worker_pid = NULL, updated_at = ? WHERE status = ?",
+            (STATUS_QUEUED, time.time(), STATUS_RUNNING),
+        )
+        return cursor.rowcount
+
+
+async def run_pipeline_job(topic: str, api_key: str):
+    """Default job function: run the full content pipeline for a topic."""
+    from core.workflow import run_content_pipeline
+    return await run_content_pipeline(topic, api_key)
+
+
+async def _run_job(queue, job_fn, job_id, topic, api_key):
+    """
+    Run one claimed job and record its result.
+    The peak RSS recorded is the worker's while the job ran, so it is
+    shared by the jobs that ran alongside it in the same worker.
+    """
+    from core.events import RssSampler
+
+    memory = RssSampler()
+    try:
+        with memory:
+            if inspect.iscoroutinefunction(job_fn):
+                result = await job_fn(topic, api_key)
+            else:
+                result = await asyncio.to_thread(job_fn, topic, api_key)
+        queue.complete(job_id, result, memory.peak_mb)
+    except Exception as e:
+        queue.fail(job_id, str(e), memory.peak_mb)
+
+
+async def _worker_main(queue, secrets, job_fn, stop_event, poll_interval, max_jobs):
+    """Claim jobs while fewer than `max_jobs` are running; finish running jobs on stop."""
+    worker_pid = os.getpid()
+    running = set()
+    key_group = None
+    while running or not stop_event.is_set():
+        if not stop_event.is_set() and len(running) < max_jobs:
+            # The pipeline sets the API key process-wide, so concurrent jobs must share one
+            job = queue.claim(worker_pid, key_group if running else None)
+            if job is not None:
+                job_id, topic, key_group = job
+                # API keys are only held in memory, never written to the queue file
+                api_key = secrets.pop(job_id, None)
+                if api_key is None:
+                    queue.fail(job_id, "API key no longer available, please resubmit the topic.")
+                else:
+                    running.add(asyncio.create_task(_run_job(queue, job_fn, job_id, topic, api_key)))
+                continue
+
+        if running:
+            _, running = await asyncio.wait(running, timeout=poll_interval,
+                                            return_when=asyncio.FIRST_COMPLETED)
+        else:
+            await asyncio.sleep(poll_interval)
+
+
+def _worker_loop(queue_path, secrets, job_fn, stop_event, poll_interval, max_jobs):
+    """Worker process entry point: run jobs on an asyncio loop until the stop event is set."""
+    queue = JobQueue(queue_path)
+    try:
+        asyncio.run(_worker_main(queue, secrets, job_fn, stop_event, poll_interval, max_jobs))
+    finally:
+        queue.close()
+
+
+class WorkerPool:
+    """
+    Pool of worker processes that drain a JobQueue.
+
+    Args:
+        num_workers (int): Number of processes. Defaults to the CPU count.
+        queue_path (str): Path to the SQLite queue file. Must not be shared with
+            another running pool. Defaults to a private temporary file.
+        job_fn: Top-level function or coroutine function `(topic, api_key) -> str`
+            run for each job. Plain functions run in a thread of the worker.
+        result_ttl (float): Seconds an uncollected result is kept before it is pruned.
+        max_jobs_per_worker (int): Jobs a worker process runs concurrently.
+    """
+
+    def __init__(self, num_workers: int = None, queue_path: str = None,
+                 job_fn=run_pipeline_job, poll_interval: float = 0.2,
+                 result_ttl: float = 3600, max_jobs_per_worker: int = 4):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.max_jobs_per_worker = max_jobs_per_worker
+        # mkdtemp creates the directory readable by the current user only
+        self._tmp_dir = None if queue_path else tempfile.mkdtemp(prefix="agritech_jobs_")
+        self.queue_path = queue_path or os.path.join(self._tmp_dir, "jobs.sqlite3")
+        self.job_fn = job_fn
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+
+        # Spawn rather than fork: the front-end process runs threads and an event loop
+        self._ctx = mp.get_context("spawn")
+        self._manager = None
+        self._secrets = None
+        self._stop_event = None
+        self._processes = []
+        self._workers_lock = threading.Lock()
+        self._queue = JobQueue(self.queue_path)
+        # Groups jobs by API key without writing the key, or an unsalted hash of it, to disk
+        self._key_salt = os.urandom(16)
+
+    def _spawn_worker(self):
+        process = self._ctx.Process(
+            target=_worker_loop,
+            args=(self.queue_path, self._secrets, self.job_fn,
+                  self._stop_event, self.poll_interval, self.max_jobs_per_worker),
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def start(self):
+        if self._processes:
+            return self
+        self._queue.requeue_running()
+        self._manager = self._ctx.Manager()
+        self._secrets = self._manager.dict()
+        self._stop_event = self._ctx.Event()
+        self._processes = [self._spawn_worker() for _ in range(self.num_workers)]
+        return self
+
+    def check_workers(self) -> int:
+        """
+        Replace worker processes that died (e.g. killed for running out of
+        memory) and fail the jobs they were running. Returns the number replaced.
+        """
+        replaced = 0
+        with self._workers_lock:
+            for i, process in enumerate(self._processes):
+                if process.is_alive():
+                    continue
+                self._queue.fail_orphaned(
+                    process.pid,
+                    f"Worker process exited unexpectedly (exit code {process.exitcode}). Please try again.",
+                )
+                self._processes[i] = self._spawn_worker()
+                replaced += 1
+        return replaced
+
+    def stop(self, timeout: float = 10):
+        if not self._processes:
+            return
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._manager.shutdown()
+        self._queue.close()
+        if self._tmp_dir:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def submit(self, topic: str, api_key: str) -> str:
+        """Queue a topic for generation and return the job id."""
+        if not self._processes:
+            raise RuntimeError("Worker pool is not running. Call start() first.")
+        self._queue.prune(self.result_ttl)
+        job_id = uuid.uuid4().hex
+        key_group = hmac.new(self._key_salt, api_key.encode("utf-8"), hashlib.sha256).hexdigest()
+        # Register the key before the job becomes visible to workers
+        self._secrets[job_id] = api_key
+        return self._queue.submit(topic, job_id, key_group)
+
+    def status(self, job_id: str):
+        return self._queue.get(job_id)
+
+    def wait(self, job_id: str, timeout: float = None, on_status=None):
+        """
+        Poll until the job finishes, remove it from the queue and return the job dict.
+        `on_status` is called whenever the job status changes, so callers can stream progress.
+        Dead workers are replaced while waiting, failing the job they were running.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        last_status = None
+        while True:
+            job = self._queue.get(job_id)
+            if job is None:
+                raise KeyError(f"Unknown job {job_id}")
+            if job["status"] != last_status:
+                last_status = job["status"]
+                if on_status:
+                    on_status(job)
+            if job["status"] in (STATUS_DONE, STATUS_FAILED):
+                # A job failed before a worker claimed it still has its key registered
+                self._secrets.pop(job_id, None)
+                self._queue.delete(job_id)
+                return job
+            if deadline is not None and time.time() > deadline:
+                self._queue.fail(job_id, f"Timed out after {timeout} seconds")
+                self._secrets.pop(job_id, None)
+                raise TimeoutError(f"Job {job_id} did not finish within {timeout} seconds")
+            if self.check_workers():
+                continue
+            time.sleep(self.poll_interval)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ==================== BENCHMARK ====================
+def _benchmark_job(topic: str, api_key: str):
+    """
+    CPU-bound stand-in for the per-event work of a pipeline run: folding a
+    search-heavy stream of synthetic events into a RunDigest, which is what
+    contends for the GIL once the model has replied.
+    """
+    from core.events import RunDigest, synthetic_events
+    for _ in range(40):
+        digest = RunDigest()
+        for event in synthetic_events(loops=20, payload_kb=64):
+            digest.add(event)
+    return f"{topic}: {digest.final_text[:60]}"
+
+
+async def _io_benchmark_job(topic: str, api_key: str):
+    """
+    Stand-in for a whole pipeline run: waits on I/O, like the model and
+    search calls, around a share of the per-event CPU work.
+    """
+    from core.events import RunDigest, synthetic_events
+    for _ in range(3):
+        await asyncio.sleep(0.3)
+        digest = RunDigest()
+        for event in synthetic_events(loops=20, payload_kb=64):
+            digest.add(event)
+    return f"{topic}: {digest.final_text[:60]}"
+
+
+def run_benchmark(worker_counts=None, jobs_per_run: int = 64, job_fn=_benchmark_job,
+                  max_jobs_per_worker: int = 1):
+    """Print jobs/second and the largest per-job worker peak RSS for increasing worker counts."""
+    worker_counts = worker_counts or sorted({1, 2, 4, os.cpu_count() or 1})
+    print(f"{job_fn.__name__}, {max_jobs_per_worker} job(s) per worker")
+    print(f"{'workers':>8} {'jobs/s':>10} {'speedup':>8} {'peak RSS MB':>12}")
+    baseline = None
+    for count in worker_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            pool = WorkerPool(count, os.path.join(tmp, "bench.sqlite3"),
+                              job_fn=job_fn, poll_interval=0.01,
+                              max_jobs_per_worker=max_jobs_per_worker)
+            with pool:
+                started = time.perf_counter()
+                job_ids = [pool.submit(f"topic {i} ", "bench-key") for i in range(jobs_per_run)]
+                jobs = [pool.wait(job_id) for job_id in job_ids]
+                elapsed = time.perf_counter() - started
+        throughput = jobs_per_run / elapsed
+        baseline = baseline or throughput
+        peak_rss = max((job["peak_rss_mb"] or 0) for job in jobs)
+        print(f"{count:>8} {throughput:>10.2f} {throughput / baseline:>7.2f}x {peak_rss:>12.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
+    for max_jobs in (1, 4):
+        print()
+        run_benchmark(job_fn=_io_benchmark_job, max_jobs_per_worker=max_jobs)
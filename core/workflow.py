@@ -3,6 +3,11 @@ workflow.py
 Creates and assembles the agriculture content workflow.
 """
 
+import os
+import re
+import time
+import uuid
+
 from google.adk.agents import Agent
 from google.adk.models.google_llm import Gemini
 from google.adk.tools import google_search
@@ -55,7 +60,7 @@ Your workflow:
    - Practical applications
    - Future outlook
    - Relevant hashtags
-3. VERIFICATION PHASE: Fact-check the post for accuracy. Verify claims, statistics, and information.
+3. VERIFICATION PHASE: Fact-check the post for accuracy. Verify claims, statistics, and information. Start your verification report with a "VERIFICATION:" heading.
 4. ITERATION: If corrections are needed, rewrite the post to address them.
 
 Execute this complete workflow for the given topic. Return only the final LinkedIn post.""",
@@ -68,3 +73,174 @@ def create_content_pipeline():
     For simplicity, we'll use a single master agent that handles the entire workflow.
     """
     return create_master_agent()
+
+def build_pipeline_query(topic: str, research: str = None) -> str:
+    """
+    Build the user query sent to the content pipeline for a topic.
+    When pre-generated research is supplied, the research phase is skipped.
+    """
+    if research:
+        return f"""Create a fact-checked LinkedIn post about: {topic}
+
+Research for this topic has already been done. Use these research notes instead of searching again:
+
+{research}
+
+Follow this workflow:
+1. WRITE: Create a professional LinkedIn post with hook, insights, applications, outlook, and hashtags
+2. VERIFY: Fact-check the post against the research notes
+3. ITERATE: Make corrections if needed
+
+Return only the final LinkedIn post."""
+
+    return f"""Create a fact-checked LinkedIn post about: {topic}
+
+Follow this complete workflow:
+1. RESEARCH: Search for current information, statistics, and case studies
+2. WRITE: Create a professional LinkedIn post with hook, insights, applications, outlook, and hashtags
+3. VERIFY: Fact-check the post for accuracy
+4. ITERATE: Make corrections if needed
+
+Return only the final LinkedIn post."""
+
+# Verification reports open with a VERIFICATION / FACT-CHECK heading or carry a <feedback> tag
+_VERIFICATION_HEADING = re.compile(r"^\s*(?:#+\s*|\*\*)?(?:VERIFICATION|FACT[- ]CHECK)\b")
+_FEEDBACK_TAG = re.compile(r"<feedback>", re.IGNORECASE)
+
+def _split_intermediate_texts(digest):
+    """
+    Split texts produced before the final post into research notes and
+    verification reports. A single master agent has no separate researcher
+    or verifier stage, so its intermediate texts are classified by content.
+    """
+    research, verification = [], []
+    for text in digest.intermediate_texts():
+        if _VERIFICATION_HEADING.match(text) or _FEEDBACK_TAG.search(text):
+            verification.append(text)
+        else:
+            research.append(text)
+    return research, verification
+
+def _grounding_sections(digest):
+    """The search queries and cited sources of a run, as text sections."""
+    sections = []
+    if digest.search_queries():
+        sections.append("SEARCH QUERIES:\n" + "\n".join(f"- {q}" for q in digest.search_queries()))
+    if digest.sources():
+        sections.append("SOURCES:\n" + "\n".join(f"- {title} ({uri})" for title, uri in digest.sources()))
+    return sections
+
+def _research_notes(digest) -> str:
+    """Research findings from session state, or rebuilt from the run's texts and search grounding."""
+    if digest.state.get("research_findings"):
+        return digest.state["research_findings"]
+    notes, _ = _split_intermediate_texts(digest)
+    notes = notes or digest.stage_texts("research")
+    sections = ["\n\n".join(notes)] if notes else []
+    return "\n\n".join(sections + _grounding_sections(digest))
+
+def _verifier_feedback(digest) -> str:
+    """Feedback from verifier stages, or the master agent's verification texts."""
+    feedback = digest.stage_texts("verifier") or _split_intermediate_texts(digest)[1]
+    return "\n\n".join(feedback)
+
+async def _run_agent(agent, query: str):
+    """
+    Run an agent on a single query.
+    Events are folded into a bounded RunDigest as they stream in rather
+    than being collected. The session service still holds the run's events
+    while it runs, because the agent builds its context from them; the
+    session is deleted as soon as the run ends.
+    Returns (digest, duration in seconds).
+    """
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+    from core.events import RunDigest
+
+    runner = InMemoryRunner(agent=agent)
+    user_id = "pipeline_user"
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name, user_id=user_id, session_id=uuid.uuid4().hex
+    )
+    message = types.Content(role="user", parts=[types.Part(text=query)])
+
+    digest = RunDigest()
+    started = time.perf_counter()
+    try:
+        async for event in runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+            digest.add(event)
+    finally:
+        await runner.session_service.delete_session(
+            app_name=runner.app_name, user_id=user_id, session_id=session.id
+        )
+    duration = time.perf_counter() - started
+    return digest, duration
+
+async def run_research_stage(topic: str, api_key: str):
+    """
+    Run only the research stage for a topic and return the research notes.
+    Used to pre-generate research off-peak.
+    """
+    os.environ["GOOGLE_API_KEY"] = api_key
+
+    digest, duration = await _run_agent(
+        create_researcher_agent(),
+        f"Research this AI in agriculture topic: {topic}",
+    )
+    if digest.state.get("research_findings"):
+        return digest.state["research_findings"], duration
+    # The researcher's final answer is its notes; append the grounding it searched with
+    parts = [digest.final_text.strip()] + _grounding_sections(digest)
+    return "\n\n".join(part for part in parts if part) or None, duration
+
+async def run_content_pipeline(topic: str, api_key: str, archive: bool = True,
+                               source: str = "live", archive_path: str = None):
+    """
+    Run the complete pipeline for a topic and return the cleaned post text.
+    Kept free of Streamlit so it can also run inside worker processes.
+
+    When `archive` is set, archived research for a closely matching topic
+    (at most a week old) is reused instead of searching again, and the run is stored in the
+    searchable post archive (at `archive_path`, if given) under `source`.
+    A run that reused research references the archived row by
+    `research_source_id` in its metrics instead of storing a copy.
+    """
+    from core.archive import PostArchive, DEFAULT_ARCHIVE_PATH, MAX_REUSE_AGE_SECONDS, SOURCE_LIVE
+
+    os.environ["GOOGLE_API_KEY"] = api_key
+
+    post_archive = PostArchive(archive_path or DEFAULT_ARCHIVE_PATH) if archive else None
+    try:
+        cached_research = None
+        if post_archive is not None and source == SOURCE_LIVE:
+            cached_research = post_archive.find_research(topic, max_age=MAX_REUSE_AGE_SECONDS)
+        research = cached_research["research_findings"] if cached_research else None
+
+        digest, duration = await _run_agent(
+            create_content_pipeline(), build_pipeline_query(topic, research)
+        )
+        post = digest.final_text.strip()
+        if not post:
+            return None
+
+        if post_archive is not None:
+            if cached_research:
+                post_archive.record_hit(cached_research, "research")
+            post_archive.add(
+                topic=topic,
+                linkedin_post=post,
+                research_findings="" if cached_research else _research_notes(digest),
+                verifier_feedback=_verifier_feedback(digest),
+                metrics={
+                    "duration_seconds": round(duration, 2),
+                    "event_count": digest.event_count,
+                    "post_characters": len(post),
+                    "research_source_id": cached_research["id"] if cached_research else None,
+                    "stages": digest.summary(),
+                },
+                source=source,
+            )
+        return post
+    finally:
+        if post_archive is not None:
+            post_archive.close()